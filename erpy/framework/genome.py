@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import abc
+import hashlib
 import pickle
 from abc import ABC
 from dataclasses import dataclass
@@ -97,12 +98,23 @@ class Genome(abc.ABC):
     def generate(config: GenomeConfig, genome_id: int, *args, **kwargs) -> Genome:
         raise NotImplementedError
 
+    @classmethod
+    def generate_batch(cls, config: GenomeConfig, genome_id: int, num_genomes: int, *args, **kwargs) -> List[Genome]:
+        # Override when several genomes can be generated at once more cheaply than one by one
+        return [cls.generate(config, genome_id, *args, **kwargs) for _ in range(num_genomes)]
+
     def mutate(self, child_genome_id: int, *args, **kwargs) -> Genome:
         raise NotImplementedError
 
     def cross_over(self, partner_genome: Genome, child_genome_id: int) -> Genome:
         raise NotImplementedError
 
+    def structural_hash(self) -> int:
+        # 64-bit hash of the genome's content (independent of its id), equal for structurally identical genomes.
+        #   Used as the genome's key in archives that are pickled into checkpoints, so it must be deterministic
+        #   across processes: do not use the builtin hash() of str/bytes, which is salted per process.
+        raise NotImplementedError
+
     def save(self, path: str):
         with open(path, 'wb') as handle:
             pickle.dump(self, handle, protocol=pickle.HIGHEST_PROTOCOL)
@@ -159,6 +171,13 @@ class ESGenome(Genome, ABC):
     def cross_over(self, partner_genome: Genome, child_genome_id: int) -> ESGenome:
         raise NotImplementedError
 
+    def structural_hash(self) -> int:
+        parameters = np.ascontiguousarray(self._parameters)
+        digest = hashlib.blake2b(digest_size=8)
+        digest.update(f"{parameters.dtype.str}{parameters.shape}".encode())
+        digest.update(parameters.tobytes())
+        return int.from_bytes(digest.digest(), 'little')
+
     @property
     def specification(self) -> RobotSpecification:
         if self._specification is None:
@@ -4,6 +4,7 @@ from erpy.framework.evaluator import EvaluationCallback
 from erpy.framework.genome import Genome
 from erpy.instances.evaluators.ray.evaluation_actors.controller_learning import RayControllerLearningEvaluatorConfig
 from erpy.instances.loggers.wandb_logger import WandBLoggerConfig
+from erpy.utils.tensorboard import resolve_sync_tensorboard
 
 
 class DistributedWandbInitialisationEvaluationCallback(EvaluationCallback):
@@ -28,9 +29,11 @@ class DistributedWandbInitialisationEvaluationCallback(EvaluationCallback):
         group = self.logger_config.group
         tags = self.logger_config.tags
         name = f"{self.logger_config.run_name}-genome-{genome_id}"
+        sync_tensorboard = resolve_sync_tensorboard(enabled=True,
+                                                    caller="DistributedWandbInitialisationEvaluationCallback")
         self._wandb_run = wandb.init(project=project_name, group=group, tags=tags, name=name,
                                      resume="allow", id=name,
-                                     sync_tensorboard=True)
+                                     sync_tensorboard=sync_tensorboard)
 
     def from_genome(self, genome: Genome) -> None:
         self._initialise_wandb(genome.genome_id)
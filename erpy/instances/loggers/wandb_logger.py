@@ -2,18 +2,24 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Optional, Type, Union, Any, Iterable, cast
+from typing import List, Optional, Type, Union, Any, Dict, Tuple, Set, FrozenSet, cast
 
 import numpy as np
 import wandb
+from numpy.typing import ArrayLike
 
 from erpy.framework.ea import EAConfig
 from erpy.framework.logger import Logger, LoggerConfig
 from erpy.framework.population import Population
 from erpy.utils.config2json import config2dict
+from erpy.utils.math import WelfordStats
+from erpy.utils.tensorboard import resolve_sync_tensorboard
 
 WandBRun = wandb.wandb_sdk.wandb_run.Run
 
+# Saver paths that have already been created by this process
+_created_saver_paths: Set[str] = set()
+
 
 @dataclass
 class WandBLoggerConfig(LoggerConfig):
@@ -39,22 +45,41 @@ class WandBLoggerConfig(LoggerConfig):
         return WandBLogger
 
 
-def wandb_log_values(run: WandBRun, name: str, values: List[float], step: int) -> None:
-    run.log({f'{name}_max': np.max(values),
-             f'{name}_min': np.min(values),
-             f'{name}_mean': np.mean(values),
-             f'{name}_std': np.std(values)}, step=step)
+def _summary_statistics(name: str, max_value: float, min_value: float, mean: float, std: float) -> Dict[str, float]:
+    return {f'{name}_max': max_value,
+            f'{name}_min': min_value,
+            f'{name}_mean': mean,
+            f'{name}_std': std}
+
+
+def wandb_log_values(name: str, values: ArrayLike) -> Dict[str, float]:
+    # Convert once (unless already given a float64 array) and derive all statistics from the same buffer
+    if not (isinstance(values, np.ndarray) and values.dtype == np.float64):
+        values = np.asarray(values, dtype=np.float64)
+    return _summary_statistics(name=name, max_value=values.max(), min_value=values.min(),
+                               mean=values.mean(), std=values.std())
+
+
+def wandb_log_stats(name: str, stats: WelfordStats) -> Dict[str, float]:
+    return _summary_statistics(name=name, max_value=stats.max, min_value=stats.min, mean=stats.mean, std=stats.std)
 
 
-def wandb_log_value(run: WandBRun, name: str, value: Union[float, int], step: int) -> None:
-    run.log({name: value}, step=step)
+def wandb_log_value(name: str, value: Union[float, int]) -> Dict[str, Union[float, int]]:
+    return {name: value}
 
 
-def wandb_log_unknown(run: WandBRun, name: str, data: Any, step: int) -> None:
-    if isinstance(data, Iterable):
-        wandb_log_values(run=run, name=name, values=data, step=step)
-    else:
-        wandb_log_value(run=run, name=name, value=data, step=step)
+def wandb_log_unknown(name: str, data: Any) -> Dict[str, Any]:
+    # Aggregate anything that converts to a non-empty numeric array (e.g. lists of per episode vectors),
+    #   log everything else (e.g. scalars, strings, dicts, wandb media) as is
+    if not isinstance(data, (str, bytes, dict)):
+        try:
+            values = np.asarray(data, dtype=np.float64)
+        except (ValueError, TypeError):
+            pass
+        else:
+            if values.ndim >= 1 and values.size > 0:
+                return wandb_log_values(name=name, values=values)
+    return wandb_log_value(name=name, value=data)
 
 
 class WandBLogger(Logger):
@@ -62,15 +87,20 @@ class WandBLogger(Logger):
         super().__init__(config=config)
 
         self.run: Optional[WandBRun] = None
+        self._er_info_keys: FrozenSet[str] = frozenset()
+        self._er_log_keys: Tuple[str, ...] = tuple()
+        self._er_log_names: Tuple[str, ...] = tuple()
         if self.config.pre_initialise_wandb:
             self._initialise_wandb()
 
     def _initialise_wandb(self) -> None:
+        sync_tensorboard = resolve_sync_tensorboard(enabled=self.config.enable_tensorboard_backend,
+                                                    caller="WandBLogger")
         self.run = wandb.init(project=self.config.project_name,
                               group=self.config.group,
                               tags=self.config.tags,
                               config=config2dict(self.config),
-                              sync_tensorboard=self.config.enable_tensorboard_backend)
+                              sync_tensorboard=sync_tensorboard)
 
         assert self.run is not None
         self.config.run_name = self.run.name
@@ -89,49 +119,71 @@ class WandBLogger(Logger):
             if (self.run.name is None):
                 self.run.name = "unknown_run"
             new_path = previous_path / self.run.name
-            new_path.mkdir(exist_ok=True, parents=True)
+            if str(new_path) not in _created_saver_paths:
+                new_path.mkdir(exist_ok=True, parents=True)
+                _created_saver_paths.add(str(new_path))
             self._ea_config.saver_config.save_path = str(new_path)
 
-    def _log_fitness(self, population: Population) -> None:
-        assert self.run is not None
-        fitnesses = [er.fitness for er in population.evaluation_results]
-        wandb_log_values(run=self.run, name='generation/fitness',
-                         values=fitnesses, step=population.generation)
-
-    def _log_population_data(self, population: Population) -> None:
-        assert self.run is not None
-        for name, data in population.logging_data:
-            wandb_log_unknown(run=self.run, name=name,
-                              data=data, step=population.generation)
-
-    def _log_evaluation_result_data(self, population: Population) -> None:
-        assert self.run is not None
+    def _log_fitness(self, population: Population) -> Dict[str, Any]:
+        # Only the summary statistics are logged, so accumulate them without materialising the fitnesses
+        stats = WelfordStats()
+        for er in population.evaluation_results:
+            stats.update(er.fitness)
+        return wandb_log_stats(name='generation/fitness', stats=stats)
+
+    def _log_population_data(self, population: Population) -> Dict[str, Any]:
+        data = dict()
+        for name, value in population.logging_data.items():
+            data.update(wandb_log_unknown(name=name, data=value))
+        return data
+
+    def _update_er_log_keys(self, population: Population) -> None:
+        info = population.evaluation_results[0].info
+        # Only rescan the info keys for logging keys when the set of keys changed
+        if info.keys() != self._er_info_keys:
+            self._er_info_keys = frozenset(info)
+            self._er_log_keys = tuple(key for key in info if key.startswith('logging_'))
+            self._er_log_names = tuple("evaluation_results/" + key.replace("logging_", "")
+                                       for key in self._er_log_keys)
+
+    def _log_evaluation_result_data(self, population: Population) -> Dict[str, Any]:
+        data = dict()
+        if not population.evaluation_results:
+            return data
 
         # log info from evaluation result's info
-        try:
-            er_log_keys = [key for key in population.evaluation_results[0].info.keys() if
-                           key.startswith('logging_')]
-            for key in er_log_keys:
-                name = "evaluation_results/" + key.replace("logging_", "")
+        self._update_er_log_keys(population)
+        for key, name in zip(self._er_log_keys, self._er_log_names):
+            try:
+                values = np.fromiter((er.info[key] for er in population.evaluation_results), dtype=np.float64,
+                                     count=len(population.evaluation_results))
+            except (ValueError, TypeError):
+                # Not all values are scalars (e.g. per episode vectors), let wandb_log_unknown decide
                 values = [er.info[key] for er in population.evaluation_results]
-                wandb_log_unknown(run=self.run, name=name,
-                                  data=values, step=population.generation)
-        except IndexError:
-            pass
+            data.update(wandb_log_unknown(name=name, data=values))
 
-    def _log_failures(self, population: Population) -> None:
-        assert self.run is not None
-        failures = [er.info["episode_failures"]
-                    for er in population.evaluation_results]
-        physics_failures = sum([er_failure["physics"]
-                               for er_failure in failures])
-        wandb_log_value(run=self.run, name="episode_failures",
-                        value=physics_failures, step=population.generation)
+        return data
+
+    def _log_failures(self, population: Population) -> Dict[str, Any]:
+        # Total every failure category in a single pass over the evaluation results
+        totals: Dict[str, int] = dict()
+        for er in population.evaluation_results:
+            for category, num_failures in er.info["episode_failures"].items():
+                totals[category] = totals.get(category, 0) + num_failures
+
+        data = {f"episode_failures/{category}": total for category, total in totals.items()}
+        data["episode_failures"] = totals.get("physics", 0)
+        return data
 
     def log(self, population: Population) -> None:
         if self.run is None:
             self._initialise_wandb()
-        self._log_fitness(population)
-        self._log_population_data(population)
-        self._log_evaluation_result_data(population)
-        self._log_failures(population)
+        assert self.run is not None
+
+        # Gather everything for this generation so that wandb receives a single event
+        data = dict()
+        data.update(self._log_fitness(population))
+        data.update(self._log_population_data(population))
+        data.update(self._log_evaluation_result_data(population))
+        data.update(self._log_failures(population))
+        self.run.log(data, step=population.generation)
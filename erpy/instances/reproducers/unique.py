@@ -1,20 +1,56 @@
 from __future__ import annotations
 
+import inspect
+import logging
+import sys
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import Type, Callable, Set, Optional
+from numbers import Integral
+from typing import Type, Callable, Set, Optional, Union, Iterator, Dict, Any, Literal
 
 from tqdm import tqdm
 
 from erpy.framework.genome import Genome
 from erpy.framework.population import Population
 from erpy.framework.reproducer import ReproducerConfig, Reproducer
+from erpy.utils.bloom_filter import ScalableBloomFilterArchive
+
+# Holds the structural hashes of accepted genomes (see Genome.structural_hash)
+Archive = Union[Set[int], ScalableBloomFilterArchive]
+
+
+def structural_hash_uniqueness_test(archive: Archive, genome_hash: int, genome: Genome,
+                                    population: Population) -> bool:
+    return genome_hash not in archive
 
 
 @dataclass
 class UniqueReproducerConfig(ReproducerConfig):
-    uniqueness_test: Callable[[Set, Genome, Population], bool]
+    # Receives the archive, the genome's structural hash, the genome and the population (see
+    #   structural_hash_uniqueness_test). The reproducer archives the hashes of accepted genomes itself,
+    #   uniqueness tests must not mutate the archive.
+    uniqueness_test: Callable[[Archive, int, Genome, Population], bool]
     max_retries: int
     initialisation_f: Optional[Callable[[Reproducer, Population], None]] = None
+    # "set" keeps an exact archive, "bloom" trades a small false positive rate for far less memory
+    archive_backend: Literal["set", "bloom"] = "set"
+    bloom_error_rate: float = 1e-4
+
+    def __post_init__(self) -> None:
+        if not callable(self.uniqueness_test):
+            raise TypeError("UniqueReproducerConfig.uniqueness_test must be callable")
+        try:
+            num_parameters = len(inspect.signature(self.uniqueness_test).parameters)
+        except (TypeError, ValueError):
+            num_parameters = None
+        if not isinstance(self.max_retries, int):
+            raise TypeError("UniqueReproducerConfig.max_retries must be an int")
+        if num_parameters == 3:
+            raise TypeError("UniqueReproducerConfig.uniqueness_test now receives (archive, genome_hash, genome, "
+                            "population) and must not add to the archive, the reproducer archives accepted genomes' "
+                            "structural hashes itself. Use structural_hash_uniqueness_test or update the test.")
+        if self.archive_backend not in ("set", "bloom"):
+            raise ValueError(f"Unknown archive backend: {self.archive_backend}")
 
     @property
     def reproducer(self) -> Type[UniqueReproducer]:
@@ -22,9 +58,12 @@ class UniqueReproducerConfig(ReproducerConfig):
 
 
 class UniqueReproducer(Reproducer):
+    GENERATION_BATCH_SIZE = 16
+
     def __init__(self, config: UniqueReproducerConfig) -> None:
         super().__init__(config=config)
         self._archive = None
+        self._failed_test_cache: OrderedDict[int, bool] = OrderedDict()
 
     @property
     def config(self) -> UniqueReproducerConfig:
@@ -37,13 +76,68 @@ class UniqueReproducer(Reproducer):
         try:
             self._archive = population.saving_data[key]
         except KeyError:
-            self._archive = set()
+            self._archive = self._create_archive(population=population)
             population.saving_data[key] = self._archive
+        else:
+            if isinstance(self._archive, set) and \
+                    not all(isinstance(genome_hash, Integral) for genome_hash in self._archive):
+                raise ValueError("[UniqueReproducer] The checkpoint's archive was created by an older version that "
+                                 "archived uniqueness test data instead of Genome.structural_hash values. "
+                                 "It can not be resumed with this UniqueReproducer.")
+            if not isinstance(self._archive, self._archive_type):
+                logging.warning(f"[UniqueReproducer] Restored a {type(self._archive).__name__} archive from the "
+                                f"checkpoint, ignoring the configured '{self.config.archive_backend}' backend")
 
-    def initialise_population(self, population: Population) -> None:
-        assert self._archive is not None
+    @property
+    def _archive_type(self) -> Type[Archive]:
+        return set if self.config.archive_backend == "set" else ScalableBloomFilterArchive
+
+    def _create_archive(self, population: Population) -> Archive:
+        if self.config.archive_backend == "set":
+            return set()
+        initial_capacity = population.config.population_size * max(1, self.config.max_retries)
+        return ScalableBloomFilterArchive(initial_capacity=initial_capacity, error_rate=self.config.bloom_error_rate)
+
+    def _accept_if_unique(self, genome: Genome, population: Population) -> bool:
+        # Archives the genome's structural hash if it passes the uniqueness test
+        genome_hash = genome.structural_hash()
+
+        # Within a generation the archive only grows, so a genome that failed the test once will keep failing it.
+        #   Successful tests are not cached as the genome's hash is archived as soon as it is accepted.
+        if genome_hash in self._failed_test_cache:
+            self._failed_test_cache.move_to_end(genome_hash)
+            return False
+
+        if self.config.uniqueness_test(self._archive, genome_hash, genome, population):
+            self._archive.add(genome_hash)
+            return True
+
+        self._failed_test_cache[genome_hash] = False
+        if len(self._failed_test_cache) > 10 * population.config.population_size:
+            self._failed_test_cache.popitem(last=False)
+        return False
+
+    @staticmethod
+    def _progress_bar_kwargs(total: int) -> Dict[str, Any]:
+        # Limit redraws of the progress bars and disable them entirely when not writing to a terminal
+        return dict(mininterval=1.0, miniters=max(1, total // 100), smoothing=0.1, disable=not sys.stderr.isatty())
+
+    def _generate_candidates(self, genome_id: int, num_candidates: int) -> Iterator[Genome]:
+        # Lazily yields up to num_candidates random genomes.
+        #   Only batch when the genome provides its own generate_batch, otherwise surplus candidates are wasted work.
+        genome_type = self.config.genome_config.genome
+        is_batched = inspect.getattr_static(genome_type, "generate_batch") is not \
+            inspect.getattr_static(Genome, "generate_batch")
+        while num_candidates > 0:
+            batch_size = min(num_candidates, self.GENERATION_BATCH_SIZE) if is_batched else 1
+            yield from genome_type.generate_batch(config=self.config.genome_config, genome_id=genome_id,
+                                                  num_genomes=batch_size)
+            num_candidates -= batch_size
 
+    def initialise_population(self, population: Population) -> None:
         self._initialise_from_checkpoint(population=population)
+        assert self._archive is not None
+        self._failed_test_cache.clear()
 
         if self.config.initialisation_f is not None:
             self.config.initialisation_f(self, population)
@@ -51,19 +145,14 @@ class UniqueReproducer(Reproducer):
             num_to_generate = population.config.population_size - \
                 len(population.to_evaluate)
 
-            for i in tqdm(range(num_to_generate), desc="[UniqueReproducer] Initialisation"):
-                # Create genome
+            for i in tqdm(range(num_to_generate), desc="[UniqueReproducer] Initialisation",
+                          **self._progress_bar_kwargs(num_to_generate)):
+                # Create genome, the last candidate is kept even if none of them is unique
                 genome_id = self.next_genome_id
-                genome = self.config.genome_config.genome.generate(config=self.config.genome_config,
-                                                                   genome_id=genome_id)
-
-                num_retries = 0
-                while not self.config.uniqueness_test(self._archive, genome,
-                                                      population) and num_retries < self.config.max_retries:
-                    genome = self.config.genome_config.genome.generate(config=self.config.genome_config,
-                                                                       genome_id=genome_id)
-
-                    num_retries += 1
+                for genome in self._generate_candidates(genome_id=genome_id,
+                                                        num_candidates=self.config.max_retries + 1):
+                    if self._accept_if_unique(genome, population):
+                        break
 
                 # Add genome to population
                 population.genomes[genome_id] = genome
@@ -71,34 +160,37 @@ class UniqueReproducer(Reproducer):
                 # Initial genomes should always be evaluated
                 population.to_evaluate.add(genome_id)
 
-    def reproduce(self, population: Population) -> None:
-        assert self._archive is not None
-
-        for parent_id in tqdm(population.to_reproduce, desc="[UniqueReproducer] reproduce"):
-            parent_genome = population.genomes[parent_id]
-
-            child_id = self.next_genome_id
-            child_genome = parent_genome.mutate(child_id)
-
-            num_retries = 0
-            while not self.config.uniqueness_test(self._archive, child_genome,
-                                                  population) and num_retries < self.config.max_retries:
+    def _produce_unique_child(self, parent_genome: Genome, child_id: int,
+                              population: Population) -> Optional[Genome]:
+        # Every candidate is tested exactly once: first mutations, then random genomes if mutation fails
+        child_genome = parent_genome.mutate(child_id)
+        for num_retries in range(self.config.max_retries + 1):
+            if num_retries > 0:
                 # Continue mutating the same genome until it is unique
-                child_genome.genome_id = parent_id
+                child_genome.genome_id = parent_genome.genome_id
                 child_genome = child_genome.mutate(child_id)
+            if self._accept_if_unique(child_genome, population):
+                return child_genome
+
+        # Generate a unique random genome if mutation fails to find one
+        for child_genome in self._generate_candidates(genome_id=child_id, num_candidates=self.config.max_retries):
+            if self._accept_if_unique(child_genome, population):
+                return child_genome
+
+        return None
 
-                num_retries += 1
+    def reproduce(self, population: Population) -> None:
+        assert self._archive is not None
+        # The uniqueness test may depend on the current population, so failures are only reused within a generation
+        self._failed_test_cache.clear()
 
-            if num_retries == self.config.max_retries:
-                # Generate a unique random genome if mutation fails to find one
-                num_retries = 0
-                while not self.config.uniqueness_test(self._archive, child_genome,
-                                                      population) and num_retries < self.config.max_retries:
-                    child_genome = self.config.genome_config.genome.generate(config=self.config.genome_config,
-                                                                             genome_id=child_id)
-                    num_retries += 1
+        for parent_id in tqdm(population.to_reproduce, desc="[UniqueReproducer] reproduce",
+                              **self._progress_bar_kwargs(len(population.to_reproduce))):
+            parent_genome = population.genomes[parent_id]
+            child_genome = self._produce_unique_child(parent_genome=parent_genome, child_id=self.next_genome_id,
+                                                      population=population)
 
-            if num_retries < self.config.max_retries:
+            if child_genome is not None:
                 # Add the unique child to the population
                 population.genomes[child_genome.genome_id] = child_genome
 
@@ -109,6 +201,6 @@ class UniqueReproducer(Reproducer):
             self._archive)
 
     @property
-    def archive(self) -> Set:
+    def archive(self) -> Archive:
         assert self._archive is not None
         return self._archive
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import math
+from collections import deque
+from typing import Deque, List, Set, Tuple, Union
+
+import numpy as np
+
+_MASK_64 = (1 << 64) - 1
+
+Key = Union[int, np.integer]
+
+
+def _mix_64(x: int) -> int:
+    # splitmix64 finaliser, spreads the bits of (structural) hashes that are not uniformly distributed
+    x = (x ^ (x >> 30)) * 0xBF58476D1CE4E5B9 & _MASK_64
+    x = (x ^ (x >> 27)) * 0x94D049BB133111EB & _MASK_64
+    return x ^ (x >> 31)
+
+
+def _hash_pair(key: Key) -> Tuple[int, int]:
+    # Only integer keys (e.g. Genome.structural_hash) are supported: their hash is deterministic across processes,
+    #   so archives restored from a checkpoint remain valid
+    assert isinstance(key, (int, np.integer)), "Bloom filter archives only support integer keys"
+    h1 = _mix_64(int(key) & _MASK_64)
+    h2 = _mix_64(h1 ^ 0x9E3779B97F4A7C15) | 1
+    return h1, h2
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float) -> None:
+        assert capacity > 0, "BloomFilter requires a positive capacity"
+        assert 0 < error_rate < 1, "BloomFilter requires an error rate in (0, 1)"
+
+        self._capacity = capacity
+        self._num_bits = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self._num_hashes = max(1, round(self._num_bits / capacity * math.log(2)))
+        self._bits = bytearray(math.ceil(self._num_bits / 8))
+        self._count = 0
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @property
+    def is_full(self) -> bool:
+        return self._count >= self._capacity
+
+    def _indices(self, key: Key) -> List[int]:
+        # Double hashing: the i-th index is h1 + i * h2
+        h1, h2 = _hash_pair(key)
+        return [(h1 + i * h2) % self._num_bits for i in range(self._num_hashes)]
+
+    def add(self, key: Key) -> None:
+        for index in self._indices(key):
+            self._bits[index >> 3] |= 1 << (index & 7)
+        self._count += 1
+
+    def __contains__(self, key: Key) -> bool:
+        return all(self._bits[index >> 3] & (1 << (index & 7)) for index in self._indices(key))
+
+    def __len__(self) -> int:
+        return self._count
+
+
+class ScalableBloomFilterArchive:
+    # Set-like archive of integer keys backed by a chain of bloom filters that grows once the current filter is full.
+    #   Membership checks never give false negatives, false positives occur at roughly the configured error rate.
+    #   The most recently added keys are also kept in an exact set and are answered without touching the filters.
+    def __init__(self, initial_capacity: int, error_rate: float = 1e-4, num_recent: int = 1024) -> None:
+        self._initial_capacity = max(1, initial_capacity)
+        self._error_rate = error_rate
+        self._filters: List[BloomFilter] = [BloomFilter(capacity=self._initial_capacity, error_rate=error_rate)]
+
+        self._recent_order: Deque[Key] = deque()
+        self._recent: Set[Key] = set()
+        self._num_recent = num_recent
+
+    def _remember(self, key: Key) -> None:
+        self._recent.add(key)
+        self._recent_order.append(key)
+        if len(self._recent_order) > self._num_recent:
+            self._recent.discard(self._recent_order.popleft())
+
+    def add(self, key: Key) -> None:
+        if key in self:
+            return
+
+        current = self._filters[-1]
+        if current.is_full:
+            # Grow geometrically and tighten the error rate so the compound error rate stays bounded
+            current = BloomFilter(capacity=current.capacity * 2,
+                                  error_rate=self._error_rate * 0.5 ** len(self._filters))
+            self._filters.append(current)
+
+        current.add(key)
+        self._remember(key)
+
+    def __contains__(self, key: Key) -> bool:
+        if key in self._recent:
+            return True
+        return any(key in bloom_filter for bloom_filter in reversed(self._filters))
+
+    def __len__(self) -> int:
+        return sum(len(bloom_filter) for bloom_filter in self._filters)
@@ -1,21 +1,34 @@
 import dataclasses
+import functools
 import json
-from typing import Dict, Any
+from typing import Dict, Any, Callable
 
 
-class Config2JSONEncoder(json.JSONEncoder):
-    def default(self, o):
-        try:
-            if dataclasses.is_dataclass(o):
-                return dataclasses.asdict(o)
-            return super().default(o)
-        except TypeError:
-            return str(o)
+@functools.lru_cache(maxsize=None)
+def _compile_dataclass2dict(cls: type) -> Callable[[Any], Dict]:
+    # Generate a converter specialised to the fields of cls, so fields are only reflected once per type
+    items = ", ".join(f"{field.name!r}: _to_plain(o.{field.name})" for field in dataclasses.fields(cls))
+    namespace = {"_to_plain": _to_plain}
+    exec(f"def dataclass2dict(o):\n    return {{{items}}}\n", namespace)
+    return namespace["dataclass2dict"]
+
+
+def _to_plain(o: Any) -> Any:
+    # Walk the config tree into JSON-compatible builtins, stringifying anything unsupported
+    if dataclasses.is_dataclass(o) and not isinstance(o, type):
+        return _compile_dataclass2dict(type(o))(o)
+    if isinstance(o, (list, tuple)):
+        return [_to_plain(value) for value in o]
+    if isinstance(o, dict):
+        return {key if isinstance(key, str) else json.dumps(key): _to_plain(value) for key, value in o.items()}
+    if isinstance(o, (int, float, bool, str, type(None))):
+        return o
+    return str(o)
 
 
 def config2json(config: Any) -> str:
-    return json.dumps(obj=config, cls=Config2JSONEncoder)
+    return json.dumps(obj=_to_plain(config))
 
 
 def config2dict(config: Any) -> Dict:
-    return json.loads(config2json(config=config))
+    return _to_plain(config)
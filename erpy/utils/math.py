@@ -12,3 +12,40 @@ def renormalize(data: np.ndarray,
     delta2 = target_range[1] - target_range[0]
 
     return (delta2 * (data - original_range[0]) / delta1) + target_range[0]
+
+
+class WelfordStats:
+    # Running max, min, mean and (population) standard deviation using Welford's online algorithm.
+    #   All statistics are nan as long as no value has been added.
+    def __init__(self) -> None:
+        self.n = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._min = np.inf
+        self._max = -np.inf
+
+    def update(self, value: float) -> None:
+        self.n += 1
+        delta = value - self._mean
+        self._mean += delta / self.n
+        self._m2 += delta * (value - self._mean)
+        if value < self._min:
+            self._min = value
+        if value > self._max:
+            self._max = value
+
+    @property
+    def max(self) -> float:
+        return self._max if self.n > 0 else np.nan
+
+    @property
+    def min(self) -> float:
+        return self._min if self.n > 0 else np.nan
+
+    @property
+    def mean(self) -> float:
+        return self._mean if self.n > 0 else np.nan
+
+    @property
+    def std(self) -> float:
+        return np.sqrt(self._m2 / self.n) if self.n > 0 else np.nan
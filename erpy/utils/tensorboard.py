@@ -0,0 +1,17 @@
+import importlib.util
+import logging
+
+
+def tensorboard_available() -> bool:
+    return importlib.util.find_spec("tensorboard") is not None
+
+
+def resolve_sync_tensorboard(enabled: bool, caller: str) -> bool:
+    # Only let wandb sync (and spawn its TensorBoard scanning thread) when TensorBoard can actually be written
+    if not enabled:
+        return False
+    if not tensorboard_available():
+        logging.warning(f"[{caller}] TensorBoard sync is enabled but tensorboard is not installed, "
+                        f"disabling wandb's TensorBoard sync")
+        return False
+    return True
@@ -0,0 +1,39 @@
+import pickle
+
+import pytest
+
+from erpy.utils.bloom_filter import ScalableBloomFilterArchive
+
+
+def test_no_false_negatives_when_growing() -> None:
+    archive = ScalableBloomFilterArchive(initial_capacity=100, error_rate=1e-3, num_recent=10)
+    keys = range(-2500, 2500)
+    for key in keys:
+        archive.add(key)
+
+    assert all(key in archive for key in keys)
+
+
+def test_false_positive_rate() -> None:
+    archive = ScalableBloomFilterArchive(initial_capacity=1000, error_rate=1e-3, num_recent=0)
+    for key in range(1000):
+        archive.add(key)
+
+    num_false_positives = sum(key in archive for key in range(10 ** 6, 10 ** 6 + 100000))
+    assert num_false_positives / 100000 < 5e-3
+
+
+def test_survives_pickling() -> None:
+    archive = ScalableBloomFilterArchive(initial_capacity=10, num_recent=0)
+    for key in range(100):
+        archive.add(key * 7919)
+
+    restored = pickle.loads(pickle.dumps(archive))
+    assert all(key * 7919 in restored for key in range(100))
+    assert len(restored) == len(archive)
+
+
+def test_rejects_non_integer_keys() -> None:
+    archive = ScalableBloomFilterArchive(initial_capacity=10)
+    with pytest.raises(AssertionError):
+        archive.add("genome")
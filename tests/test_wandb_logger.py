@@ -0,0 +1,41 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+wandb_logger = pytest.importorskip("erpy.instances.loggers.wandb_logger")
+
+
+def _create_logger() -> wandb_logger.WandBLogger:
+    config = wandb_logger.WandBLoggerConfig(project_name="test", group=None, tags=[], update_saver_path=False,
+                                            pre_initialise_wandb=False)
+    return wandb_logger.WandBLogger(config=SimpleNamespace(logger_config=config))
+
+
+def _create_population(infos) -> SimpleNamespace:
+    return SimpleNamespace(evaluation_results=[SimpleNamespace(info=info) for info in infos])
+
+
+def test_log_evaluation_result_data_summarises_per_episode_arrays() -> None:
+    logger = _create_logger()
+    population = _create_population([{"logging_episode_rewards": np.array([1.0, 2.0, 3.0])},
+                                      {"logging_episode_rewards": np.array([4.0, 5.0, 6.0])}])
+
+    data = logger._log_evaluation_result_data(population)
+
+    name = "evaluation_results/episode_rewards"
+    assert set(data) == {f"{name}_max", f"{name}_min", f"{name}_mean", f"{name}_std"}
+    assert data[f"{name}_max"] == 6.0
+    assert data[f"{name}_min"] == 1.0
+    assert data[f"{name}_mean"] == pytest.approx(3.5)
+    assert data[f"{name}_std"] == pytest.approx(np.std(np.arange(1.0, 7.0)))
+
+
+def test_log_evaluation_result_data_summarises_scalars() -> None:
+    logger = _create_logger()
+    population = _create_population([{"logging_distance": 1.0, "other": 0}, {"logging_distance": 3.0, "other": 0}])
+
+    data = logger._log_evaluation_result_data(population)
+
+    assert data["evaluation_results/distance_mean"] == pytest.approx(2.0)
+    assert "evaluation_results/other_mean" not in data